@@ -1,5 +1,4 @@
 from .page_parser import PageParser
 from .index_parser import IndexParser
-from .codex_types import CodexType
-
+from .codex_types import CodexType, MetaEntry, TagEntry, StatEntry, DropGroup, DropItem, json_default
 
@@ -1,7 +1,142 @@
-from dataclasses import dataclass
+import sys
+from typing import Optional, Union
+
+intern = sys.intern
+
+
+def _intern(value):
+    # lxml returns str subclasses, which sys.intern refuses
+    return intern(str(value)) if isinstance(value, str) else value
+
+
+def index_key(name: str) -> str:
+    return intern(name.lower().replace(' ', '_'))
+
+
+def json_default(obj) -> dict:
+    # shallow: nested records go through this hook again while encoding,
+    # so json.dump(record, default=json_default) never builds the full dict tree
+    if isinstance(obj, _Entry):
+        return {f: getattr(obj, f) for f in obj.__slots__ if getattr(obj, f) is not None}
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+class _Entry:
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        data = {}
+        for field in self.__slots__:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**data)
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_dict()!r})'
+
+
+class MetaEntry(_Entry):
+    __slots__ = ('name', 'base')
+
+    name: str
+    base: Optional[Union[str, list]]
+
+    def __init__(self, name: str, base: Optional[Union[str, list]] = None):
+        self.name = _intern(name)
+        self.base = [_intern(i) for i in base] if isinstance(base, list) else _intern(base)
+
+    def index_value(self) -> Optional[Union[str, list]]:
+        return self.base
+
+
+class TagEntry(_Entry):
+    __slots__ = ('name', )
+
+    name: str
+
+    def __init__(self, name: str):
+        self.name = _intern(name)
+
+
+class StatEntry(_Entry):
+    __slots__ = ('name', 'base', 'element')
+
+    name: str
+    base: Optional[str]
+    element: Optional[str]
+
+    def __init__(self, name: str, base: Optional[str] = None, element: Optional[str] = None):
+        self.name = _intern(name)
+        self.base = _intern(base)
+        self.element = _intern(element)
+
+    def index_value(self) -> str:
+        return self.base if self.base else self.name
+
+
+class DropItem(_Entry):
+    # slot order is the key order of to_dict()
+    __slots__ = ('codex', 'name', 'chance', 'icon', 'ability')
+
+    codex: Optional[str]
+    name: str
+    chance: Optional[str]
+    icon: Optional[str]
+    ability: Optional[str]
+
+    def __init__(self, name: str, codex: Optional[str] = None, chance: Optional[str] = None,
+                 icon: Optional[str] = None, ability: Optional[str] = None):
+        self.codex = _intern(codex)
+        self.name = _intern(name)
+        self.chance = _intern(chance)
+        self.icon = _intern(icon)
+        self.ability = _intern(ability)
+
+    def index_value(self) -> Union[str, list]:
+        if self.codex:
+            return self.codex.strip('/').split('/')[-2:]
+        elif self.chance:
+            return [self.name, self.chance]
+        elif self.ability:
+            return [self.name, self.ability]
+        else:
+            return self.name
+
+
+class DropGroup(_Entry):
+    __slots__ = ('name', 'base')
+
+    name: str
+    base: list
+
+    def __init__(self, name: str, base: Optional[list] = None):
+        self.name = _intern(name)
+        self.base = base if base is not None else []
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'base': [i.to_dict() for i in self.base]}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**{**data, 'base': [DropItem.from_dict(i) for i in data.get('base', [])]})
+
+    def index_value(self) -> list:
+        return [c.index_value() for c in self.base]
+
+
+class CodexType(_Entry):
+    __slots__ = ('codex', 'name', 'rarity', 'icon', 'description', 'meta', 'tag', 'stat', 'drop')
 
-@dataclass
-class CodexType:
     codex: str
     name: str
     rarity: str
@@ -10,4 +145,65 @@ class CodexType:
     meta: list
     tag: list
     stat: list
-    drop: list
\ No newline at end of file
+    drop: list
+
+    def __init__(self, codex: str, name: str, rarity: str, icon: str, description: str,
+                 meta: list, tag: list, stat: list, drop: list):
+        self.codex = _intern(codex)
+        self.name = _intern(name)
+        self.rarity = _intern(rarity)
+        self.icon = _intern(icon)
+        self.description = description
+        self.meta = meta
+        self.tag = tag
+        self.stat = stat
+        self.drop = drop
+
+    def to_dict(self) -> dict:
+        return {
+            'codex': self.codex,
+            'name': self.name,
+            'rarity': self.rarity,
+            'icon': self.icon,
+            'description': self.description,
+            'meta': [m.to_dict() for m in self.meta],
+            'tag': [t.to_dict() for t in self.tag],
+            'stat': [s.to_dict() for s in self.stat],
+            'drop': [d.to_dict() for d in self.drop],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CodexType':
+        return cls(**{
+            **data,
+            'description': data.get('description', ''),
+            'meta': [MetaEntry.from_dict(m) for m in data.get('meta', [])],
+            'tag': [TagEntry.from_dict(t) for t in data.get('tag', [])],
+            'stat': [StatEntry.from_dict(s) for s in data.get('stat', [])],
+            'drop': [DropGroup.from_dict(d) for d in data.get('drop', [])],
+        })
+
+    def to_index(self, filters: dict, base: Optional[dict] = None) -> dict:
+        # base: meta/drop/stat keys (or the index entry) of the base language,
+        # reused in order for translations
+        index_data = {
+            'name': self.name,
+            'codex': self.codex,
+            'rarity': self.rarity,
+            'icon': intern(self.icon.split('/img/')[-1]),
+            'tag': [t.name for t in self.tag],
+            'meta': {},
+            'stat': {},
+            'drop': {},
+        }
+        for field in ('meta', 'drop', 'stat'):
+            entries = getattr(self, field)
+            if base is None:
+                keys = [index_key(e.name) for e in entries]
+            else:
+                keys = base[field]
+            field_index = index_data[field]
+            for key, entry in zip(keys, entries):
+                field_index[key] = entry.index_value()
+                filters[field][key] = entry.name
+        return index_data
@@ -1,10 +1,8 @@
-from lxml import etree
-
-
 class IndexParser:
 
     @classmethod
     def parse_iter(cls, html: str):
+        from lxml import etree
         parser = etree.HTMLParser(encoding='utf-8')
         page = etree.HTML(html, parser=parser)
         entries_elems = page.xpath('/html/body/div[@class="codex"]/div[@class="codex-entries"]/a')
@@ -16,6 +14,7 @@ class IndexParser:
     
     @classmethod
     def parse_codex_index(cls, html: str):
+        from lxml import etree
         parser = etree.HTMLParser(encoding='utf-8')
         page = etree.HTML(html, parser=parser)
         elems = page.xpath('/html/body/div[@class="wraps"]/div[@class="page"]/a[@class="codex-link"]')
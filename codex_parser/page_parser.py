@@ -1,10 +1,8 @@
 import re
 from collections import defaultdict
-from typing import Iterator, Tuple, Union
+from typing import Iterator, Optional, Tuple, Union
 
-from lxml import etree
-
-from .codex_types import CodexType
+from .codex_types import CodexType, DropGroup, DropItem, MetaEntry, StatEntry, TagEntry
 
 SPLIT_PATTERN = r':|：'
 STRIP_PATTERN = ''.join(SPLIT_PATTERN)
@@ -23,32 +21,20 @@ class PageParser:
             if elem.tag == 'h4':
                 drop_header = elem.text.strip(STRIP_PATTERN)
                 data = []
-                drop.append({'name': drop_header, 'base': data})
+                drop.append(DropGroup(drop_header, data))
             elif elem.attrib.get('class') == 'drop':
                 drop_str = elem.xpath("string()").strip() 
                 icon = elem.xpath('img')[0].attrib.get('src')[31:]
                 ability = elem.xpath('../div[@class="emph"]')
                 matches = effect_pattern.match(drop_str)
                 if elem.tag == 'a':
-                    data.append({
-                        'codex': elem.attrib.get('href'), 
-                        'name': drop_str,
-                        'icon': icon,
-                    })
+                    data.append(DropItem(codex=elem.attrib.get('href'), name=drop_str, icon=icon))
                 elif matches:
-                    data.append({
-                        'name':matches.group('EFFECT'), 
-                        'chance': matches.group('CHANCE'),
-                        'icon': icon,
-                    })
+                    data.append(DropItem(name=matches.group('EFFECT'), chance=matches.group('CHANCE'), icon=icon))
                 elif ability:
-                    data.append({
-                        'name': drop_str, 
-                        'icon': icon,
-                        'ability': ability[0].xpath("string()").strip(),
-                    })
+                    data.append(DropItem(name=drop_str, icon=icon, ability=ability[0].xpath("string()").strip()))
                 else:
-                    data.append({'name': drop_str, 'icon': icon})
+                    data.append(DropItem(name=drop_str, icon=icon))
         return drop
     
 
@@ -62,52 +48,48 @@ class PageParser:
                 # fix event sort
                 if elem.xpath('contains(@class, "codex-page-description-highlight")'):
                     value = [i.strip() for i in value.split('/')]
-                yield {'name': matches.group('KEY'), 'base': value}
+                yield MetaEntry(matches.group('KEY'), value)
             else:
-                yield {'name': kv}
+                yield MetaEntry(kv)
     
     @classmethod
     def meta_parse_iter(cls, elems: list):
         for elem in elems:
             span = elem.xpath('span')
             if len(span) > 0 and span[0].xpath('boolean(@class="exotic")'):
-                yield {'name': 'exotic', 'base': span[0].xpath("string()").strip()}
+                yield MetaEntry('exotic', span[0].xpath("string()").strip())
                 continue
             meta = elem.xpath("string()").strip()
             matches = kv_pattern.match(meta)
             if matches:
-                yield {'name': matches.group('KEY'), 'base': matches.group('VALUE')}
+                yield MetaEntry(matches.group('KEY'), matches.group('VALUE'))
             else:
-                yield {'name': meta}
+                yield MetaEntry(meta)
 
     @classmethod
     def stat_parse_iter(cls, elems: list):
         for elem in elems:
             stats = elem.attrib.get('class').split()
             if len(stats) > 1:
-                yield {'name': elem.xpath("string()").strip(), 'element': stats[1], }
+                yield StatEntry(name=elem.xpath("string()").strip(), element=stats[1])
                 continue
             stat = elem.xpath("string()").strip()
             matches = kv_pattern.match(stat)
             if matches:
-                yield {'name': matches.group('KEY'), 'base': matches.group('VALUE')}
+                yield StatEntry(name=matches.group('KEY'), base=matches.group('VALUE'))
             else:
-                yield {'name': stat}
+                yield StatEntry(name=stat)
 
     @classmethod
-    def description_parse(cls, pre_elems: list, div_elems: list, codex_type: str) -> Tuple[str, list, dict]:
+    def description_parse(cls, pre_elems: list, div_elems: list, codex_type: str) -> Tuple[str, list, Optional[DropGroup]]:
         description = pre_elems[0].xpath("string()").strip() if len(pre_elems) > 0 else ''
         meta_extra = []
-        offhand = {}
+        offhand = None
         if codex_type in {'items'} and len(div_elems) > 0:
             ability = re.split(SPLIT_PATTERN, div_elems[0].xpath("preceding-sibling::div[1]")[0].xpath("string()").strip())
-            offhand = {
-                'name': ability[0],
-                'base': [{
-                    'name': ability[1].strip(),
-                    'ability': div_elems[0].xpath("string()").strip(),
-                }]
-            }
+            offhand = DropGroup(ability[0], [
+                DropItem(name=ability[1].strip(), ability=div_elems[0].xpath("string()").strip()),
+            ])
         if codex_type in {'bosses', 'monsters'} and len(div_elems) > 0:
             meta_extra = list(cls.kv_parse_iter(div_elems)) # type: ignore
         if codex_type in {'followers', 'raids', 'spells', 'classes'} and len(div_elems) > 0:
@@ -117,6 +99,8 @@ class PageParser:
 
     @classmethod
     def parse(cls, html: str, codex: str, raw_dict: bool = False) -> Union[dict, CodexType, None]:
+        # lxml is only loaded by the stages that parse html
+        from lxml import etree
         parser = etree.HTMLParser(encoding='utf-8')
         page = etree.HTML(html, parser=parser)
         name = page.xpath('/html/body/div[@class="hero smaller"]/h1/text()')[0]
@@ -136,7 +120,7 @@ class PageParser:
         meta = meta_extra + list(cls.meta_parse_iter(meta_elems))
 
         tag_elems = page.xpath('/html/body/div[@class="wraps"]/div[@class="page"]/div[@class="codex-page"]//div[@class="codex-page-tag"]')
-        tag = [{'name': i['name'][2:]} for i in cls.kv_parse_iter(tag_elems)]
+        tag = [TagEntry(i.name[2:]) for i in cls.kv_parse_iter(tag_elems)]
 
         stat_elems = page.xpath('/html/body/div[@class="wraps"]/div[@class="page"]/div[@class="codex-page"]/div[@class="codex-stats"]//div[contains(@class,"codex-stat")]')
         stat = list(cls.stat_parse_iter(stat_elems))
@@ -146,32 +130,18 @@ class PageParser:
             '|/html/body/div[@class="wraps"]/div[@class="page"]/div[@class="codex-page"]//*[@class="drop"]'
         )
         drop = cls.drop_parse(drop_elems)
-        if offhand:
+        if offhand is not None:
             drop.append(offhand)
 
-        if raw_dict:
-            return {
-                'codex': codex,
-                'name': name,
-                'rarity': icon_rarity,
-                'icon': icon,
-                'description': description,
-                'meta': meta,
-                'tag': tag,
-                'stat': stat,
-                'drop': drop,
-            }
-        else:
-            return CodexType(
-                codex=codex,
-                name=name,
-                rarity=icon_rarity,
-                icon=icon,
-                description=description,
-                meta=meta,
-                tag=tag,
-                stat=stat,
-                drop=drop,
-            )
-    
-
+        record = CodexType(
+            codex=codex,
+            name=name,
+            rarity=icon_rarity,
+            icon=icon,
+            description=description,
+            meta=meta,
+            tag=tag,
+            stat=stat,
+            drop=drop,
+        )
+        return record.to_dict() if raw_dict else record
@@ -0,0 +1,336 @@
+import asyncio
+import gzip
+import hashlib
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from loguru import logger
+
+CACHE_BYTES = 64 * 1024 * 1024
+# larger responses are rendered per request instead of filling the cache
+CACHE_MAX_BODY = 1024 * 1024
+GZIP_MIN_SIZE = 256
+MAX_HEADER_SIZE = 16 * 1024
+# only GET and HEAD are served, bodies beyond this are refused rather than read
+MAX_BODY_SIZE = 1024
+KEEP_ALIVE_TIMEOUT = 15
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+FIELD_FILTERS = ('meta', 'stat', 'drop')
+
+REASONS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Content Too Large',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+    501: 'Not Implemented',
+}
+
+
+class Response:
+    __slots__ = ('status', 'body', 'gzip_body', 'etag', 'gzip_etag', 'size')
+
+    def __init__(self, status: int, data, build_hash: Optional[str] = None):
+        self.status = status
+        self.body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        # precompressed once, served to every client accepting gzip
+        self.gzip_body = gzip.compress(self.body, mtime=0) if len(self.body) >= GZIP_MIN_SIZE else None
+        # only successful responses are tied to the index build
+        self.etag = f'"{build_hash}"' if build_hash and status == 200 else None
+        self.gzip_etag = f'"{build_hash}-gzip"' if build_hash and status == 200 else None
+        self.size = len(self.body) + len(self.gzip_body or b'')
+
+
+class IndexServer:
+
+    def __init__(self, index_dir: str, cache_bytes: int = CACHE_BYTES):
+        self.index_dir = Path(index_dir)
+        self.cache_bytes = cache_bytes
+        self.cache: OrderedDict = OrderedDict()
+        self.cached_bytes = 0
+        self.indexes: Dict[str, Dict[str, dict]] = {}
+        self.build_hash = ''
+        self.load()
+
+    def load(self):
+        digest = hashlib.sha1()
+        indexes = {}
+        for file_path in sorted(self.index_dir.glob('*/*.json')):
+            raw = file_path.read_bytes()
+            digest.update(file_path.relative_to(self.index_dir).as_posix().encode('utf-8'))
+            digest.update(raw)
+            data = json.loads(raw)
+            # lowercase names for name search, kept alongside the index
+            data['names'] = [(k, v['name'].lower()) for k, v in data['index'].items()]
+            indexes.setdefault(file_path.parent.name, {})[file_path.stem] = data
+        self.indexes = indexes
+        self.build_hash = digest.hexdigest()[:20]
+        self.cache.clear()
+        self.cached_bytes = 0
+        logger.info(f'Loaded {sum(len(i) for i in indexes.values())} index files, build {self.build_hash}')
+
+    async def lookup(self, target: str) -> Response:
+        cached = self.cache.get(target)
+        if cached is not None:
+            self.cache.move_to_end(target)
+            return cached
+        # json.dumps and gzip of a miss run off the event loop
+        response = await asyncio.get_running_loop().run_in_executor(None, self.build_response, target)
+        if response.status == 200 and len(response.body) <= CACHE_MAX_BODY:
+            self.cache_put(target, response)
+        return response
+
+    def build_response(self, target: str) -> Response:
+        status, data = self.route(target)
+        return Response(status, data, self.build_hash)
+
+    def cache_put(self, target: str, response: Response):
+        previous = self.cache.pop(target, None)
+        if previous is not None:
+            self.cached_bytes -= previous.size
+        self.cache[target] = response
+        self.cached_bytes += response.size
+        while self.cached_bytes > self.cache_bytes and self.cache:
+            _, evicted = self.cache.popitem(last=False)
+            self.cached_bytes -= evicted.size
+
+    def route(self, target: str) -> Tuple[int, object]:
+        try:
+            url = urlsplit(target)
+            query = parse_qsl(url.query)
+        except ValueError:
+            return 400, {'error': 'malformed request target'}
+        parts = [unquote(p) for p in url.path.split('/') if p]
+        # only listings and search take parameters, so other lookups cannot
+        # grow the cache with arbitrary query strings
+        if url.query and not (len(parts) == 2 and parts[0] in self.indexes):
+            return 400, {'error': 'unexpected query string'}
+        if len(parts) == 0:
+            return 200, {
+                'build': self.build_hash,
+                'languages': {lang: sorted(interfaces) for lang, interfaces in self.indexes.items()},
+            }
+        lang_indexes = self.indexes.get(parts[0])
+        if lang_indexes is None:
+            return 404, {'error': f'unknown language {parts[0]}'}
+        if len(parts) == 2 and parts[1] == 'search':
+            return self.search(lang_indexes, query)
+        data = lang_indexes.get(parts[1]) if len(parts) > 1 else None
+        if data is None:
+            return 404, {'error': 'unknown interface'}
+        if len(parts) == 2:
+            return self.listing(data, query)
+        if len(parts) == 3 and parts[2] in data['index']:
+            return 200, data['index'][parts[2]]
+        return 404, {'error': 'not found'}
+
+    @classmethod
+    def page(cls, params: dict) -> Tuple[int, int]:
+        # raises ValueError on non-integer values
+        offset = max(int(params.get('offset', 0)), 0)
+        limit = min(max(int(params.get('limit', DEFAULT_LIMIT)), 0), MAX_LIMIT)
+        return offset, limit
+
+    @classmethod
+    def search(cls, lang_indexes: dict, query: list) -> Tuple[int, object]:
+        params = dict(query)
+        for key in params:
+            if key not in {'name', 'offset', 'limit'}:
+                return 400, {'error': f'unknown parameter {key}'}
+        name = params.get('name', '').lower()
+        if not name:
+            return 400, {'error': 'missing name'}
+        try:
+            offset, limit = cls.page(params)
+        except ValueError:
+            return 400, {'error': 'offset and limit must be integers'}
+        matched = [
+            (interface, k) for interface, data in lang_indexes.items()
+            for k, v in data['names'] if name in v
+        ]
+        result = {}
+        for interface, k in matched[offset:offset + limit]:
+            result.setdefault(interface, {})[k] = lang_indexes[interface]['index'][k]
+        return 200, {'total': len(matched), 'index': result}
+
+    @classmethod
+    def listing(cls, data: dict, query: list) -> Tuple[int, object]:
+        try:
+            offset, limit = cls.page(dict(query))
+            name = None
+            conditions = []
+            for key, value in query:
+                if key in {'offset', 'limit'}:
+                    continue
+                elif key == 'name':
+                    name = value.lower()
+                elif key in {'rarity', 'tag'}:
+                    conditions.append(((key, ), value))
+                elif key.split('.', 1)[0] in FIELD_FILTERS and '.' in key:
+                    conditions.append((tuple(key.split('.', 1)), value))
+                else:
+                    return 400, {'error': f'unknown parameter {key}'}
+        except ValueError:
+            return 400, {'error': 'offset and limit must be integers'}
+
+        index = data['index']
+        keys = [k for k, v in data['names'] if name in v] if name else list(index)
+        if conditions:
+            keys = [k for k in keys if all(cls.match(index[k], path, value) for path, value in conditions)]
+        return 200, {
+            'filters': data['filters'],
+            'total': len(keys),
+            'index': {k: index[k] for k in keys[offset:offset + limit]},
+        }
+
+    @classmethod
+    def match(cls, entry: dict, path: tuple, expected: str) -> bool:
+        value = entry
+        for p in path:
+            if not isinstance(value, dict) or p not in value:
+                return False
+            value = value[p]
+        if isinstance(value, list):
+            return any((item if isinstance(item, str) else '/'.join(item)) == expected for item in value)
+        return str(value) == expected
+
+    async def render(self, method: str, target: str, headers: dict, keep_alive: bool) -> bytes:
+        if method not in {'GET', 'HEAD'}:
+            response = Response(405, {'error': 'method not allowed'})
+        else:
+            response = await self.lookup(target)
+        use_gzip = response.gzip_body is not None and self.accepts_gzip(headers.get('accept-encoding', ''))
+        body = response.gzip_body if use_gzip else response.body
+        etag = response.gzip_etag if use_gzip else response.etag
+
+        status = response.status
+        if etag is not None and self.etag_matches(headers.get('if-none-match'), etag):
+            status = 304
+        lines = [f'HTTP/1.1 {status} {REASONS[status]}']
+        if etag is not None:
+            lines.append(f'ETag: {etag}')
+        if status == 405:
+            lines.append('Allow: GET, HEAD')
+        lines.append('Vary: Accept-Encoding')
+        lines.append(f'Connection: {"keep-alive" if keep_alive else "close"}')
+        if status == 304:
+            return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        lines.append('Content-Type: application/json; charset=utf-8')
+        lines.append(f'Content-Length: {len(body)}')
+        if use_gzip:
+            lines.append('Content-Encoding: gzip')
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        return head if method == 'HEAD' else head + body
+
+    @classmethod
+    def accepts_gzip(cls, accept_encoding: str) -> bool:
+        qualities = {}
+        for item in accept_encoding.split(','):
+            coding, _, params = item.partition(';')
+            quality = 1.0
+            for param in params.split(';'):
+                key, _, value = param.strip().partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            qualities[coding.strip().lower()] = quality
+        if 'gzip' in qualities:
+            return qualities['gzip'] > 0
+        return qualities.get('*', 0) > 0
+
+    @classmethod
+    def etag_matches(cls, if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*' or tag.removeprefix('W/') == etag:
+                return True
+        return False
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    raw = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    writer.write(self.render_error(431))
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                lines = raw.decode('latin-1').split('\r\n')
+                request_line = lines[0].split(' ')
+                if len(request_line) != 3:
+                    writer.write(self.render_error(400))
+                    break
+                method, target, version = request_line
+                headers = {}
+                for line in lines[1:]:
+                    key, _, value = line.partition(':')
+                    if key:
+                        headers[key.strip().lower()] = value.strip()
+                if 'transfer-encoding' in headers:
+                    # a chunked body would otherwise be parsed as the next request
+                    writer.write(self.render_error(501))
+                    break
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    writer.write(self.render_error(400))
+                    break
+                if length > MAX_BODY_SIZE:
+                    writer.write(self.render_error(413))
+                    break
+                if length > 0:
+                    try:
+                        await asyncio.wait_for(reader.readexactly(length), KEEP_ALIVE_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        break
+                connection = headers.get('connection', '').lower()
+                if version == 'HTTP/1.1':
+                    keep_alive = connection != 'close'
+                else:
+                    keep_alive = connection == 'keep-alive'
+                try:
+                    response = await self.render(method, target, headers, keep_alive)
+                except Exception:
+                    logger.exception(f'Failed to render {method} {target}')
+                    writer.write(self.render_error(500))
+                    break
+                writer.write(response)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def render_error(self, status: int) -> bytes:
+        body = json.dumps({'error': REASONS[status]}).encode('utf-8')
+        return (
+            f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+            f'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: close\r\n\r\n'
+        ).encode('latin-1') + body
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8000) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_SIZE)
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8000):
+        server = await self.start(host, port)
+        logger.info(f'Serving {self.index_dir} on http://{host}:{port}')
+        async with server:
+            await server.serve_forever()
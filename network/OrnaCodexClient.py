@@ -1,22 +1,26 @@
 import asyncio
 from typing import Optional, Union, AsyncIterator
 
-from httpx import AsyncClient, Timeout, Response
+from httpx import AsyncClient, QueryParams, Timeout, Response
 
 PLAYORNA_URL = 'https://playorna.com'
+TIMEOUT = Timeout(300, connect=300)
 
 
 class Client:
 
-    def __init__(self, **kwargs):
-        self._client = AsyncClient(timeout=Timeout(300, connect=300))
+    def __init__(self, pool: Optional[AsyncClient] = None, **kwargs):
+        # a shared pool is owned by the caller and left open on close()
+        self._owned = pool is None
+        self._client = AsyncClient(timeout=TIMEOUT) if pool is None else pool
+        self._params = QueryParams()
         self.set_params(**kwargs)
 
     def set_params(self, **kwargs):
-        self._client.params = self._client.params.merge(kwargs)
+        self._params = self._params.merge(kwargs)
 
     async def fetch(self, path: str, data: dict = None, raw: bool = False) -> Union[Response, str]: # type: ignore
-        r = await self._client.get(url=f'{PLAYORNA_URL}{path}', params=data)
+        r = await self._client.get(url=f'{PLAYORNA_URL}{path}', params=self._params.merge(data), timeout=TIMEOUT)
         if raw:
             return r
         else:
@@ -45,7 +49,8 @@ class Client:
         return r.text if r.status_code == 200 else None
 
     async def close(self):
-        await self._client.aclose()
+        if self._owned:
+            await self._client.aclose()
 
     async def __aenter__(self):
         await asyncio.sleep(0)
@@ -1,27 +1,33 @@
 import asyncio
 import json
+from typing import Optional
 
 from httpx import AsyncClient, Timeout
 
 
 ORNA_GUIDE_URL = 'https://orna.guide'
 ORNA_GUIDE_API_URL = 'https://orna.guide/api/v1'
+TIMEOUT = Timeout(300, read=600)
 
 
 class Client:
 
-    def __init__(self):
-        self._client = AsyncClient(timeout=Timeout(300, read=600))
+    def __init__(self, pool: Optional[AsyncClient] = None):
+        # a shared pool is owned by the caller and left open on close()
+        self._owned = pool is None
+        self._client = AsyncClient(timeout=TIMEOUT) if pool is None else pool
 
     async def fetch(self, interface: str, data: dict) -> dict:
         r = await self._client.post(
             url=f'{ORNA_GUIDE_API_URL}/{interface}',
             content=json.dumps(data),
+            timeout=TIMEOUT,
         )
         return r.json()
 
     async def close(self):
-        await self._client.aclose()
+        if self._owned:
+            await self._client.aclose()
 
     async def __aenter__(self):
         return self
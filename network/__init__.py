@@ -1 +1,8 @@
-from . import OrnaCodexClient, OrnaGuideClient
\ No newline at end of file
+from httpx import AsyncClient, Limits
+
+from . import OrnaCodexClient, OrnaGuideClient
+
+
+def create_pool(max_connections: int = 64) -> AsyncClient:
+    # one connection pool shared by every client of a pipeline run
+    return AsyncClient(limits=Limits(max_connections=max_connections, max_keepalive_connections=max_connections))
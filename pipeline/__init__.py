@@ -0,0 +1,6 @@
+# Stage modules are imported on demand by indexer.py, keep this package light.
+
+GUIDE_INTERFACES = ['item', 'monster', 'pet']
+CODEX_INTERFACES = ['items', 'classes', 'monsters', 'bosses', 'followers', 'raids', 'spells']  # buildings, dungeons
+ORNA_CODEX_WORKERS = 32
+PARSE_CODEX_WORKERS = 64
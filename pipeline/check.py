@@ -0,0 +1,54 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Optional, TYPE_CHECKING
+
+import aiofiles
+from loguru import logger
+
+from codex_parser import DropGroup
+
+if TYPE_CHECKING:
+    from httpx import AsyncClient
+
+
+async def check_miss_codex(json_dir: str, codex_dir: str, lang: str, clean: bool = False, pool: Optional['AsyncClient'] = None):
+    miss_codex_list = []
+    check_interface = ['bosses', 'items', 'monsters', 'raids']
+    for interface in check_interface:
+        logger.info(f'Checking {interface}...')
+        input_subdir = Path(json_dir).joinpath('codex', interface)
+        for file_path in input_subdir.iterdir():
+            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+                data = json.loads(await f.read())
+            for item_list in data.get('drop', []):
+                for item in DropGroup.from_dict(item_list).base:
+                    codex = item.codex
+                    if codex is None or codex.split('/')[2] not in check_interface:
+                        continue
+                    item_path = Path(json_dir).joinpath(f'{codex.strip("/")}.json')
+                    if not item_path.exists():
+                        miss_codex_list.append(item)
+                        logger.info(f'Found miss codex {item.name}(href: "{codex}")')
+    if not miss_codex_list:
+        logger.info(f'Finished all')
+        return
+    # network and parser are only needed once something is missing
+    from network import OrnaCodexClient
+    from .fetch import _fetch_codex
+    from .parse import _parse_codex
+
+    logger.info('Downloading miss codex...')
+    sem = asyncio.Semaphore(1)
+    async with OrnaCodexClient.Client(pool, lang=lang) as client:
+        for item in miss_codex_list:
+            await _fetch_codex(client, codex_dir, {'name': item.name, 'codex': item.codex}, sem)
+            file_path = Path(codex_dir).joinpath(f'{item.codex.strip("/")}.html')
+            if not file_path.exists():
+                logger.info(f'Fetch {item.name}(href: "{item.codex}") failed')
+                continue
+            logger.info(f'Parsing {file_path}...')
+            await _parse_codex(file_path, Path(json_dir).joinpath(f'{item.codex.strip("/")}.json'), sem)
+    logger.info(f'Finished all')
+
+
@@ -0,0 +1,99 @@
+import asyncio
+import json
+from pathlib import Path
+import time
+from typing import Optional
+
+import aiofiles
+from httpx import AsyncClient
+from loguru import logger
+
+from codex_parser import IndexParser
+from network import OrnaGuideClient, OrnaCodexClient
+
+from . import GUIDE_INTERFACES, CODEX_INTERFACES, ORNA_CODEX_WORKERS
+
+
+async def _fetch_codex_meta_iter(client: OrnaCodexClient.Client, interface: str):
+    async for page in client.fetch_index_iter(interface):
+        for item in IndexParser.parse_iter(page):
+            yield item
+
+async def fetch_meta_data(guide_meta_dir: str, codex_meta_dir: str, clean: bool = False, pool: Optional[AsyncClient] = None):
+    async with OrnaGuideClient.Client(pool) as client:
+        for interface in GUIDE_INTERFACES:
+            logger.info(f'Fetching {interface} from OrnaGuide...')
+            meta_data_path = Path(guide_meta_dir).joinpath(f'{interface}.json')
+            if not clean and meta_data_path.exists():
+                logger.info(f'{meta_data_path} exists, skip it')
+                continue
+            start = time.time()
+            data = await client.fetch(interface, {})
+            async with aiofiles.open(meta_data_path, 'w', encoding='utf-8') as f:
+                await f.write(json.dumps(data, indent=4))
+                logger.info(f'Cost {time.time() - start}s, Wrote {interface}.json')
+    
+    async with OrnaCodexClient.Client(pool) as client:
+        for interface in CODEX_INTERFACES:
+            logger.info(f'Fetching {interface} from OrnaCodex...')
+            meta_data_path = Path(codex_meta_dir).joinpath(f'{interface}.json')
+            if not clean and meta_data_path.exists():
+                logger.info(f'{meta_data_path} exists, skip it')
+                continue
+            start = time.time()
+            data = [item async for item in _fetch_codex_meta_iter(client, interface)]
+            async with aiofiles.open(meta_data_path, 'w', encoding='utf-8') as f:
+                await f.write(json.dumps(data, indent=4))
+                logger.info(f'Cost {time.time() - start}s, Wrote {interface}.json')
+
+
+async def _fetch_codex(client: OrnaCodexClient.Client, data_dir: str, item: dict, sem: asyncio.Semaphore):
+    # item = {'name': name, 'codex': codex}
+    async with sem:
+        logger.info(f"Get {item['codex']}")
+        if item['codex'] is None:
+            logger.info(f"Skip {item['name']}")
+            return
+        item_file_path = Path(data_dir).joinpath(f"{item['codex'].strip('/')}.html")
+        if item_file_path.exists():
+            logger.info(f'{item_file_path} exists, skip it')
+            return
+        item_file_path.parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Fetching {item['codex']} from OrnaCodex...")
+        codex_resp = await client.fetch(item['codex'], raw=True)
+        if codex_resp.status_code == 404: # type: ignore
+            logger.info(f"Skip {item['name']}")  # 404
+            return
+        async with aiofiles.open(item_file_path, 'w', encoding='utf-8') as f:
+            await f.write(codex_resp.text) # type: ignore
+            logger.info(f"Wrote {item_file_path}")
+
+
+async def fetch_codex(guide_meta_dir: str, codex_meta_dir: str, codex_dir: str, lang: str, clean: bool = True, pool: Optional[AsyncClient] = None):
+    async with OrnaCodexClient.Client(pool, lang=lang) as client:
+        sem = asyncio.Semaphore(ORNA_CODEX_WORKERS)
+        for interface in GUIDE_INTERFACES:
+            logger.info(f'Fetching {interface} from OrnaGuide...')
+            async with aiofiles.open(Path(guide_meta_dir).joinpath(f'{interface}.json'), 'r', encoding='utf-8') as f:
+                meta_data = json.loads(await f.read())
+            tasks = [asyncio.create_task(_fetch_codex(client, f'{codex_dir}/{lang}', item, sem)) for item in meta_data]
+            for task in asyncio.as_completed(tasks):
+                await task
+            logger.info(f'Finished {interface}')
+
+        for interface in CODEX_INTERFACES:
+            logger.info(f'Fetching {interface} from OrnaCodex...')
+            async with aiofiles.open(Path(codex_meta_dir).joinpath(f'{interface}.json'), 'r', encoding='utf-8') as f:
+                meta_data = json.loads(await f.read())
+            tasks = [asyncio.create_task(_fetch_codex(client, f'{codex_dir}/{lang}', item, sem)) for item in meta_data]
+            for task in asyncio.as_completed(tasks):
+                await task
+            logger.info(f'Finished {interface}')
+    logger.info(f'Finished all')
+
+
+async def fetch_codex_index(lang: str, output_dir: str):
+    async with OrnaCodexClient.Client(lang=lang) as client:
+        r = await client.fetch_codex_index()
+        d = IndexParser.parse_codex_index(r)
+        print(d)
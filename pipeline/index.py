@@ -0,0 +1,78 @@
+import asyncio
+import json
+from pathlib import Path
+from collections import defaultdict
+
+import aiofiles
+from loguru import logger
+
+from codex_parser import CodexType
+
+from . import CODEX_INTERFACES
+
+
+async def _dump_index(path: Path, filters: dict, index: dict):
+    # json.dump streams encoder chunks to the file; json.dumps would hold the
+    # chunk list and the whole document string on top of the index itself
+    def dump():
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'filters': dict(filters), 'index': index}, f, indent=4, ensure_ascii=False)
+    await asyncio.get_running_loop().run_in_executor(None, dump)
+
+
+async def build_index(input_dir: str, output_dir: str, base_lang: str = 'us-en'):
+    Path(output_dir).joinpath(base_lang).mkdir(parents=True, exist_ok=True)
+    base_dir = Path(input_dir).joinpath(base_lang)
+    for interface in CODEX_INTERFACES:
+        logger.info(f'Building {interface} Index...')
+        input_subdir = Path(base_dir).joinpath('codex', interface)
+        index = {}
+        filters = defaultdict(dict)
+        for file_path in input_subdir.iterdir():
+            async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
+                data = json.loads(await f.read())
+            record = CodexType.from_dict(data)
+            codex = record.codex.strip('/').split('/')[-1]
+            index[codex] = record.to_index(filters)
+        await _dump_index(Path(output_dir).joinpath(base_lang, f'{interface}.json'), filters, index)
+
+
+async def _load_base_keys(base_file: Path) -> dict:
+    # only the key order of each base entry is reused, drop the values
+    async with aiofiles.open(base_file, 'r', encoding='utf-8') as f:
+        base_index = json.loads(await f.read())['index']
+    return {
+        key: {field: list(value[field]) for field in ('meta', 'drop', 'stat')}
+        for key, value in base_index.items()
+    }
+
+
+async def _build_lang_index(input_dir: str, output_subdir: Path, lang: str, interface: str, base_keys: dict):
+    filters = defaultdict(dict)
+    index = {}
+    for key, keys in base_keys.items():
+        async with aiofiles.open(Path(input_dir).joinpath(lang, 'codex', interface, f'{key}.json'), 'r', encoding='utf-8') as f:
+            data = json.loads(await f.read())
+        index[key] = CodexType.from_dict(data).to_index(filters, base=keys)
+    await _dump_index(output_subdir.joinpath(f'{interface}.json'), filters, index)
+
+
+async def build_translated_index(input_dir: str, output_dir: str, base_lang: str = 'us-en'):
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    base_dir = Path(output_dir).joinpath(base_lang)
+    languages = [d.name for d in Path(input_dir).iterdir() if d.name != base_lang]
+    for base_file in base_dir.iterdir():
+        interface = base_file.stem
+        logger.info(f'Building {interface} Other Languages Index...')
+        base_keys = await _load_base_keys(base_file)
+        for lang in languages:
+            output_subdir = Path(output_dir).joinpath(lang)
+            output_subdir.mkdir(parents=True, exist_ok=True)
+            await _build_lang_index(input_dir, output_subdir, lang, interface, base_keys)
+
+
+async def build_database(input_dir: str, output_db: str):
+    # ToDo: build database
+    import aiosqlite
+    async with aiosqlite.connect(output_db) as db:
+        pass
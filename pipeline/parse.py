@@ -0,0 +1,43 @@
+import asyncio
+import json
+from pathlib import Path
+
+import aiofiles
+from loguru import logger
+
+from codex_parser import PageParser, json_default
+
+from . import PARSE_CODEX_WORKERS
+
+
+async def _parse_codex(input_path: Path, output_path: Path, sem: asyncio.Semaphore):
+    async with sem:
+        logger.info(f'Parsing {input_path}...')
+        async with aiofiles.open(input_path, 'r', encoding='utf-8') as input:
+            data_in = await input.read()
+            loop = asyncio.get_event_loop()
+            data_out = await loop.run_in_executor(
+                None, PageParser.parse, data_in, '/'.join(['', *input_path.parts[-3:-1], input_path.stem, '']),
+            )
+            if data_out is None:
+                logger.info(f'Parse {input_path} failed')
+                return 
+        async with aiofiles.open(output_path, 'w', encoding='utf-8') as output:
+            await output.write(json.dumps(data_out, indent=4, ensure_ascii=False, default=json_default))
+
+async def parse_codex(input_dir: str, output_dir: str):
+    output_path = Path(output_dir).joinpath('codex')
+    for type_dir in Path(input_dir).joinpath('codex').iterdir():
+        output_type_dir = output_path.joinpath(type_dir.name)
+        output_type_dir.mkdir(parents=True, exist_ok=True)
+        tasks = []
+        sem = asyncio.Semaphore(PARSE_CODEX_WORKERS)
+        for file_path in type_dir.iterdir():
+            if output_type_dir.joinpath(f'{file_path.stem}.json').exists():
+                continue
+            tasks.append(asyncio.create_task(_parse_codex(file_path, output_type_dir.joinpath(f'{file_path.stem}.json'), sem)))
+        for task in asyncio.as_completed(tasks):
+            await task
+    logger.info(f'Finished all')
+
+
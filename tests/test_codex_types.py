@@ -0,0 +1,138 @@
+import json
+from collections import defaultdict
+
+import pytest
+
+from codex_parser import CodexType, DropGroup, DropItem, MetaEntry, StatEntry, TagEntry, json_default
+
+
+RECORD = {
+    'codex': '/codex/items/sword/',
+    'name': 'Sword',
+    'rarity': 'rare',
+    'icon': '/static/img/items/sword.png',
+    'description': 'A blade',
+    'meta': [
+        {'name': 'Tier', 'base': '5'},
+        {'name': 'Event', 'base': ['Fall', 'Winter']},
+        {'name': 'Place'},
+    ],
+    'tag': [{'name': 'Weapon'}],
+    'stat': [
+        {'name': 'Attack', 'base': '10'},
+        {'name': 'Fire', 'element': 'fire'},
+        {'name': 'Two handed'},
+    ],
+    'drop': [
+        {'name': 'Dropped by', 'base': [{'codex': '/codex/monsters/rat/', 'name': 'Rat', 'icon': 'rat.png'}]},
+        {'name': 'Causes', 'base': [{'name': 'Burn', 'chance': '10%', 'icon': 'burn.png'}]},
+        {'name': 'Skills', 'base': [
+            {'name': 'Slash', 'icon': 'slash.png', 'ability': 'Deals damage'},
+            {'name': 'Plain', 'icon': 'plain.png'},
+        ]},
+    ],
+}
+
+TRANSLATED = {
+    **RECORD,
+    'name': '劍',
+    'meta': [{'name': '階級', 'base': '5'}, {'name': '活動', 'base': ['秋', '冬']}, {'name': '地點'}],
+    'stat': [{'name': '攻擊', 'base': '10'}, {'name': '火', 'element': 'fire'}, {'name': '雙手'}],
+    'drop': [
+        {'name': '掉落自', 'base': [{'codex': '/codex/monsters/rat/', 'name': '鼠', 'icon': 'rat.png'}]},
+        {'name': '造成', 'base': [{'name': '燃燒', 'chance': '10%', 'icon': 'burn.png'}]},
+        {'name': '技能', 'base': [{'name': '斬', 'icon': 'slash.png', 'ability': '造成傷害'}, {'name': '普通', 'icon': 'plain.png'}]},
+    ],
+}
+
+
+def old_index_entry(data: dict, filters: dict, base: dict = None) -> dict:
+    # dict-based index entry as built by indexer.py before the record model
+    index_data = {
+        'name': data['name'],
+        'codex': data['codex'],
+        'rarity': data['rarity'],
+        'icon': data['icon'].split('/img/')[-1],
+        'tag': [t['name'] for t in data.get('tag', [])],
+        'meta': {},
+        'stat': {},
+        'drop': {},
+    }
+
+    def keys(field):
+        if base is None:
+            return [e['name'].lower().replace(' ', '_') for e in data.get(field, [])]
+        return list(base[field].keys())
+
+    for name, m in zip(keys('meta'), data.get('meta', [])):
+        index_data['meta'][name] = m.get('base')
+        filters['meta'][name] = m['name']
+    for name, d in zip(keys('drop'), data.get('drop', [])):
+        tmp = []
+        for c in d['base']:
+            if c.get('codex'):
+                tmp.append(c['codex'].strip('/').split('/')[-2:])
+            elif c.get('chance'):
+                tmp.append([c['name'], c['chance']])
+            elif c.get('ability'):
+                tmp.append([c['name'], c['ability']])
+            else:
+                tmp.append(c['name'])
+        index_data['drop'][name] = tmp
+        filters['drop'][name] = d['name']
+    for name, s in zip(keys('stat'), data.get('stat', [])):
+        index_data['stat'][name] = s['base'] if s.get('base') else s['name']
+        filters['stat'][name] = s['name']
+    return index_data
+
+
+def test_round_trip():
+    record = CodexType.from_dict(RECORD)
+    assert record.to_dict() == RECORD
+    assert json.dumps(record.to_dict()) == json.dumps(RECORD)
+
+
+def test_entry_kinds():
+    record = CodexType.from_dict(RECORD)
+    assert record.meta[2] == MetaEntry('Place')
+    assert record.tag == [TagEntry('Weapon')]
+    assert record.stat[1] == StatEntry('Fire', element='fire')
+    assert isinstance(record.drop[0], DropGroup)
+    assert record.drop[0].base[0] == DropItem('Rat', codex='/codex/monsters/rat/', icon='rat.png')
+    assert record.drop[1].base[0].chance == '10%'
+    assert record.drop[2].base[0].ability == 'Deals damage'
+
+
+def test_json_default_matches_to_dict():
+    record = CodexType.from_dict(RECORD)
+    assert json.dumps(record, default=json_default, indent=4) == json.dumps(RECORD, indent=4)
+
+
+@pytest.mark.parametrize('cls, data', [
+    (MetaEntry, {'name': 'Tier', 'extra': 1}),
+    (TagEntry, {'name': 'Weapon', 'extra': 1}),
+    (StatEntry, {'name': 'HP', 'extra': 1}),
+    (DropItem, {'name': 'Rat', 'extra': 1}),
+    (DropGroup, {'name': 'Drops', 'base': [], 'extra': 1}),
+    (CodexType, {**RECORD, 'extra': 1}),
+])
+def test_from_dict_rejects_unknown_keys(cls, data):
+    with pytest.raises(TypeError):
+        cls.from_dict(data)
+
+
+def test_to_index_matches_dict_index():
+    filters, old_filters = defaultdict(dict), defaultdict(dict)
+    entry = CodexType.from_dict(RECORD).to_index(filters)
+    assert entry == old_index_entry(RECORD, old_filters)
+    assert filters == old_filters
+
+
+def test_to_index_translated_matches_dict_index():
+    base = old_index_entry(RECORD, defaultdict(dict))
+    filters, old_filters = defaultdict(dict), defaultdict(dict)
+    entry = CodexType.from_dict(TRANSLATED).to_index(filters, base=base)
+    assert entry == old_index_entry(TRANSLATED, old_filters, base=base)
+    assert filters == old_filters
+    assert list(entry['meta']) == ['tier', 'event', 'place']
+    assert filters['meta']['tier'] == '階級'
@@ -0,0 +1,248 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from index_server import IndexServer
+from index_server.server import MAX_BODY_SIZE, MAX_HEADER_SIZE, MAX_LIMIT, Response
+
+
+def index_entry(codex: str, name: str, tier: str) -> dict:
+    return {
+        'name': name,
+        'codex': f'/codex/items/{codex}/',
+        'rarity': 'rare',
+        'icon': f'items/{codex}.png',
+        'tag': ['Weapon'],
+        'meta': {'tier': tier, 'description': 'A long description. ' * 20},
+        'stat': {'attack': '10'},
+        'drop': {'dropped_by': [['monsters', 'rat']]},
+    }
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    items = {f'sword-{i}': index_entry(f'sword-{i}', f'Sword {i}', str(i % 3)) for i in range(10)}
+    for lang in ('us-en', 'zh-tw'):
+        (tmp_path / lang).mkdir()
+        (tmp_path / lang / 'items.json').write_text(json.dumps({
+            'filters': {'meta': {'tier': 'Tier'}, 'stat': {'attack': 'Attack'}, 'drop': {'dropped_by': 'Dropped by'}},
+            'index': items,
+        }), encoding='utf-8')
+    return tmp_path
+
+
+async def read_response(reader: asyncio.StreamReader, method: str = 'GET'):
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    status = int(head[0].split(' ')[1])
+    headers = {}
+    for line in head[1:]:
+        key, _, value = line.partition(':')
+        if key:
+            headers[key.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if method != 'HEAD' and status != 304 else b''
+    return status, headers, body
+
+
+def run(index_dir, requests: list) -> list:
+    # send every raw request over one connection to a server on an ephemeral port
+    async def main():
+        server = IndexServer(str(index_dir))
+        tcp = await server.start('127.0.0.1', 0)
+        port = tcp.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        responses = []
+        try:
+            for raw in requests:
+                writer.write(raw.encode('latin-1'))
+                await writer.drain()
+                responses.append(await read_response(reader, raw.split(' ', 1)[0]))
+        finally:
+            writer.close()
+            tcp.close()
+            await tcp.wait_closed()
+        return responses
+    return asyncio.run(main())
+
+
+def run_raw(index_dir, raw: bytes) -> bytes:
+    # send raw bytes and read until the server closes the connection
+    async def main():
+        tcp = await IndexServer(str(index_dir)).start('127.0.0.1', 0)
+        reader, writer = await asyncio.open_connection('127.0.0.1', tcp.sockets[0].getsockname()[1])
+        try:
+            writer.write(raw)
+            await writer.drain()
+            return await asyncio.wait_for(reader.read(), 5)
+        finally:
+            writer.close()
+            tcp.close()
+            await tcp.wait_closed()
+    return asyncio.run(main())
+
+
+def get(path: str, *headers: str, method: str = 'GET') -> str:
+    return '\r\n'.join([f'{method} {path} HTTP/1.1', 'Host: localhost', *headers]) + '\r\n\r\n'
+
+
+def test_entry_lookup(index_dir):
+    [(status, headers, body)] = run(index_dir, [get('/us-en/items/sword-1')])
+    assert status == 200
+    assert headers['content-type'].startswith('application/json')
+    assert json.loads(body)['name'] == 'Sword 1'
+
+
+@pytest.mark.parametrize('path', ['/fr-fr/items/sword-1', '/us-en/items/missing', '/us-en/nothing'])
+def test_not_found(index_dir, path):
+    [(status, headers, _)] = run(index_dir, [get(path)])
+    assert status == 404
+    assert 'etag' not in headers
+
+
+@pytest.mark.parametrize('path', ['/us-en/items?limit=x', '/us-en/items?foo=1', '/us-en/search?name=a&limit=x', '/us-en/search'])
+def test_bad_request(index_dir, path):
+    [(status, headers, _)] = run(index_dir, [get(path)])
+    assert status == 400
+    assert 'etag' not in headers
+
+
+def test_listing_filters_and_clamps_limit(index_dir):
+    [(_, _, body), (_, _, clamped)] = run(index_dir, [
+        get('/us-en/items?meta.tier=1&limit=2'),
+        get(f'/us-en/items?limit={MAX_LIMIT * 10}'),
+    ])
+    data = json.loads(body)
+    assert data['total'] == 3
+    assert list(data['index']) == ['sword-1', 'sword-4']
+    assert len(json.loads(clamped)['index']) == 10
+
+
+def test_search_pagination(index_dir):
+    [(status, _, body)] = run(index_dir, [get('/us-en/search?name=sword&offset=8&limit=5')])
+    data = json.loads(body)
+    assert status == 200
+    assert data['total'] == 10
+    assert list(data['index']['items']) == ['sword-8', 'sword-9']
+
+
+def test_if_none_match(index_dir):
+    [(_, plain, _), (_, zipped, _)] = run(index_dir, [
+        get('/us-en/items/sword-1'),
+        get('/us-en/items/sword-1', 'Accept-Encoding: gzip'),
+    ])
+    assert plain['etag'] != zipped['etag']
+    [(status, headers, body), (gzip_status, _, _), (mismatch, _, _)] = run(index_dir, [
+        get('/us-en/items/sword-1', f'If-None-Match: {plain["etag"]}'),
+        get('/us-en/items/sword-1', 'Accept-Encoding: gzip', f'If-None-Match: {zipped["etag"]}'),
+        get('/us-en/items/sword-1', f'If-None-Match: {zipped["etag"]}'),
+    ])
+    assert (status, gzip_status, mismatch) == (304, 304, 200)
+    assert headers['etag'] == plain['etag']
+    assert body == b''
+
+
+def test_gzip_body(index_dir):
+    [(_, plain, body), (_, headers, zipped), (_, refused, _)] = run(index_dir, [
+        get('/us-en/items/sword-1'),
+        get('/us-en/items/sword-1', 'Accept-Encoding: br, gzip'),
+        get('/us-en/items/sword-1', 'Accept-Encoding: gzip;q=0, identity'),
+    ])
+    assert 'content-encoding' not in plain
+    assert headers['content-encoding'] == 'gzip'
+    assert gzip.decompress(zipped) == body
+    assert 'content-encoding' not in refused
+
+
+def test_keep_alive(index_dir):
+    responses = run(index_dir, [get('/us-en/items/sword-1'), get('/zh-tw/items/sword-2')])
+    assert [r[0] for r in responses] == [200, 200]
+    assert all(r[1]['connection'] == 'keep-alive' for r in responses)
+
+
+def test_head_has_no_body(index_dir):
+    [(status, headers, body), (after, _, _)] = run(index_dir, [
+        get('/us-en/items/sword-1', method='HEAD'),
+        get('/us-en/items/sword-2'),
+    ])
+    assert status == 200
+    assert int(headers['content-length']) > 0
+    assert body == b''
+    assert after == 200
+
+
+def test_method_not_allowed(index_dir):
+    [(status, headers, _)] = run(index_dir, [get('/us-en/items', 'Content-Length: 0', method='POST')])
+    assert status == 405
+    assert headers['allow'] == 'GET, HEAD'
+    assert 'etag' not in headers
+
+
+def test_bad_content_length(index_dir):
+    [(status, headers, _)] = run(index_dir, [get('/us-en/items', 'Content-Length: nope')])
+    assert status == 400
+    assert headers['connection'] == 'close'
+
+
+def test_cache_is_bounded_by_bytes(index_dir):
+    server = IndexServer(str(index_dir), cache_bytes=4096)
+
+    async def main():
+        for i in range(10):
+            await server.lookup(f'/us-en/items/sword-{i}')
+    asyncio.run(main())
+    assert 0 < server.cached_bytes <= 4096
+    assert server.cached_bytes == sum(r.size for r in server.cache.values())
+    assert '/us-en/items/sword-9' in server.cache
+    assert '/us-en/items/sword-0' not in server.cache
+
+
+def test_error_response_has_no_etag():
+    response = Response(404, {'error': 'not found'}, 'abc')
+    assert response.etag is None and response.gzip_etag is None
+
+
+@pytest.mark.parametrize('path', ['//[/x', '/us-en/items/sword-1?foo=1', '/?foo=1'])
+def test_rejected_targets(index_dir, path):
+    [(status, headers, _)] = run(index_dir, [get(path)])
+    assert status == 400
+    assert 'etag' not in headers
+
+
+def test_unexpected_error_is_500(index_dir, monkeypatch):
+    def broken(self, target):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(IndexServer, 'route', broken)
+    raw = run_raw(index_dir, get('/us-en/items/sword-1').encode('latin-1'))
+    assert raw.startswith(b'HTTP/1.1 500 ')
+    assert b'Connection: close' in raw
+
+
+def test_transfer_encoding_is_refused(index_dir):
+    request = get('/us-en/items/sword-1', 'Transfer-Encoding: chunked') + '5\r\nhello\r\n0\r\n\r\n'
+    raw = run_raw(index_dir, request.encode('latin-1'))
+    assert raw.startswith(b'HTTP/1.1 501 ')
+    assert raw.count(b'HTTP/1.1') == 1
+
+
+def test_large_body_is_refused(index_dir):
+    raw = run_raw(index_dir, get('/us-en/items/sword-1', 'Content-Length: 2000000000').encode('latin-1'))
+    assert raw.startswith(b'HTTP/1.1 413 ')
+    assert b'Connection: close' in raw
+
+
+def test_small_body_is_discarded(index_dir):
+    body = 'x' * MAX_BODY_SIZE
+    responses = run(index_dir, [
+        get('/us-en/items/sword-1', f'Content-Length: {len(body)}') + body,
+        get('/us-en/items/sword-2'),
+    ])
+    assert [r[0] for r in responses] == [200, 200]
+    assert json.loads(responses[1][2])['name'] == 'Sword 2'
+
+
+def test_large_headers_are_refused(index_dir):
+    raw = run_raw(index_dir, get('/us-en/items/sword-1', 'X-Big: ' + 'a' * MAX_HEADER_SIZE).encode('latin-1'))
+    assert raw.startswith(b'HTTP/1.1 431 ')
+    assert b'Connection: close' in raw
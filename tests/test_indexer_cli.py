@@ -0,0 +1,70 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+import indexer
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize('argv, func, options', [
+    (['fetch-meta'], indexer.run_fetch_meta, {'clean', 'data_dir'}),
+    (['fetch-codex'], indexer.run_fetch_codex, {'clean', 'lang', 'data_dir'}),
+    (['parse-codex'], indexer.run_parse_codex, {'clean', 'lang', 'data_dir'}),
+    (['check-miss'], indexer.run_check_miss, {'lang', 'data_dir'}),
+    (['build-index'], indexer.run_build_index, {'clean', 'data_dir'}),
+    (['all'], indexer.run_all, {'clean', 'lang', 'data_dir'}),
+    (['serve'], indexer.run_serve, {'data_dir', 'host', 'port'}),
+])
+def test_subcommand_options(argv, func, options):
+    args = indexer.parse_args(argv)
+    assert args.func is func
+    assert set(vars(args)) - {'command', 'func'} == options
+
+
+@pytest.mark.parametrize('argv', [['serve', '--clean'], ['build-index', '--lang', 'zh-tw'], ['check-miss', '--clean']])
+def test_unused_options_are_rejected(argv):
+    with pytest.raises(SystemExit):
+        indexer.parse_args(argv)
+
+
+def test_legacy_flags_map_to_subcommands(capsys):
+    args = indexer.parse_args(['--lang', 'zh-tw', '--check-miss'])
+    assert args.func is indexer.run_check_miss
+    assert args.lang == 'zh-tw'
+    assert 'check-miss' in capsys.readouterr().err
+
+
+def test_light_stages_skip_httpx_and_lxml():
+    code = (
+        'import sys, indexer, pipeline.index, pipeline.check; '
+        'print(sorted(m for m in ("httpx", "lxml") if m in sys.modules))'
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
+
+
+def test_run_all_shares_one_pool(monkeypatch):
+    import network
+
+    pools = []
+    received = []
+
+    def create_pool():
+        pools.append(httpx.AsyncClient())
+        return pools[-1]
+
+    async def stage(args, dirs, pool=None):
+        received.append(pool)
+
+    monkeypatch.setattr(network, 'create_pool', create_pool)
+    for name in ('run_fetch_meta', 'run_fetch_codex', 'run_parse_codex', 'run_check_miss'):
+        monkeypatch.setattr(indexer, name, stage)
+    asyncio.run(indexer.run_all(indexer.parse_args(['all']), indexer.DataDirs('unused')))
+    assert len(pools) == 1
+    assert received == [pools[0]] * 4
+    assert pools[0].is_closed